@@ -17,6 +17,9 @@ import java.util.Stack
  *
  * For more details about the role of the C Preprocessor in C programs, see the (very) concise
  * overview at https://www.w3schools.com/c/c_macros.php
+ *
+ * Keep in sync with `_preprocess_header` in lib-python/build_backend.py, which applies the same preprocessing to
+ * headers taken from `KSON_PREBUILT_BIN_DIR`.
  */
 class TinyCPreprocessor {
     fun preprocess(sourcePath: String) : String {
@@ -3,10 +3,12 @@ Custom build backend for kson Python package.
 This backend ensures native artifacts are built when creating source distributions.
 """
 
+import errno
 import os
 import subprocess
 import shutil
 import sys
+from collections import deque
 from pathlib import Path
 from setuptools import build_meta as _orig
 from setuptools.build_meta import *
@@ -32,6 +34,95 @@ def _required_artifacts():
     return [_platform_native_library(), "jni_simplified.h"]
 
 
+# Directory holding already built native artifacts to use instead of running Gradle, such as
+# kson-lib/build/kotlin/compileGraalVmNativeImage (same variable as used by lib-rust/kson-sys)
+PREBUILT_BIN_DIR_ENV_VAR = "KSON_PREBUILT_BIN_DIR"
+
+# Number of trailing Gradle output lines to include in the error when the build fails
+GRADLE_LOG_TAIL_LINES = 200
+
+
+def _run_streaming(args, cwd):
+    """Run a command, echoing its combined stdout/stderr as it is produced.
+
+    Return the exit code together with the last GRADLE_LOG_TAIL_LINES lines of output.
+    """
+    tail = deque(maxlen=GRADLE_LOG_TAIL_LINES)
+    with subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        cwd=cwd,
+    ) as process:
+        for line in process.stdout:
+            print(line, end="")
+            tail.append(line)
+    return process.returncode, tail
+
+
+def _present_files(directory):
+    """Return the names of the entries in directory, or an empty set if it does not exist."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
+
+
+def _preprocess_header(header):
+    """Simplify a raw jni_simplified.h so that cffi can parse it.
+
+    A port of the TinyCPreprocessor that CopyNativeArtifactsTask applies when Gradle copies the header: defines are
+    dropped, nothing is ever considered defined, and unsupported `__attribute__` typedefs are removed. Already
+    preprocessed headers pass through unchanged.
+
+    Keep in sync with buildSrc/src/main/kotlin/org/kson/TinyCPreprocessor.kt
+    """
+    output = []
+    scopes = []
+    for line in header.splitlines():
+        if line.startswith("#define"):
+            continue
+        elif line.startswith("#ifndef"):
+            scopes.append(True)
+            continue
+        elif line.startswith("#ifdef"):
+            scopes.append(False)
+            continue
+        elif line.startswith("#else"):
+            if scopes:
+                scopes.append(not scopes.pop())
+            continue
+        elif line.startswith("#endif"):
+            if scopes:
+                scopes.pop()
+            continue
+
+        if "typedef float __attribute__" in line:
+            continue
+
+        if not scopes or scopes[-1]:
+            output.append(line + "\n")
+    return "".join(output)
+
+
+def _move_tree(src, dst):
+    """Move the directory src to dst, which must not exist.
+
+    This is a rename when both are on the same filesystem, falling back to a copy otherwise. Unlike shutil.move, it
+    never moves src *into* an existing dst.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copytree(src, dst)
+        shutil.rmtree(src)
+
+
 def _ensure_native_artifacts():
     """Build native artifacts using the bundled Gradle setup."""
     lib_python_dir = Path(__file__).parent
@@ -41,23 +132,35 @@ def _ensure_native_artifacts():
 
     # Only check for the native library needed on *this* platform
     required = _required_artifacts()
-    artifacts_exist = all((src_kson_dir / f).exists() for f in required)
-
-    if not artifacts_exist and kson_copy_dir.exists():
+    present = _present_files(src_kson_dir)
+    artifacts_exist = all(f in present for f in required)
+
+    prebuilt_dir = os.environ.get(PREBUILT_BIN_DIR_ENV_VAR)
+    if not artifacts_exist and prebuilt_dir:
+        print(f"Copying prebuilt native artifacts from {prebuilt_dir}...")
+        src_kson_dir.mkdir(parents=True, exist_ok=True)
+        for f in required:
+            prebuilt_file = Path(prebuilt_dir) / f
+            if not prebuilt_file.is_file():
+                continue
+            if f == "jni_simplified.h":
+                # The native image build emits a raw header, which cffi cannot parse as is
+                (src_kson_dir / f).write_text(_preprocess_header(prebuilt_file.read_text()))
+            else:
+                shutil.copy2(prebuilt_file, src_kson_dir / f)
+        present = _present_files(src_kson_dir)
+
+    elif not artifacts_exist and kson_copy_dir.exists():
         print(f"Building native artifacts for {sys.platform} with bundled Gradle setup...")
 
         gradlew = "./gradlew" if os.name != "nt" else "gradlew.bat"
-        result = subprocess.run(
-            [gradlew, "lib-python:build"],
-            capture_output=True,
-            text=True,
-            cwd=kson_copy_dir,
-        )
+        returncode, output_tail = _run_streaming([gradlew, "lib-python:build"], cwd=kson_copy_dir)
 
-        if result.returncode != 0:
-            print(f"Gradle build stdout:\n{result.stdout}")
-            print(f"Gradle build stderr:\n{result.stderr}")
-            raise RuntimeError("Failed to build native artifacts")
+        if returncode != 0:
+            raise RuntimeError(
+                f"Failed to build native artifacts (Gradle exited with {returncode}). "
+                f"Last lines of output:\n{''.join(output_tail)}"
+            )
 
         print("Native artifacts built successfully")
 
@@ -71,8 +174,11 @@ def _ensure_native_artifacts():
             if marker_c.exists():
                 marker_c_content = marker_c.read_bytes()
 
-            shutil.rmtree(src_dir, ignore_errors=True)
-            shutil.copytree(kson_copy_src, src_dir)
+            # Fail loudly if src cannot be removed (e.g. a locked library on Windows), rather than leaving stale
+            # artifacts behind
+            if src_dir.exists():
+                shutil.rmtree(src_dir)
+            _move_tree(kson_copy_src, src_dir)
 
             # Restore _marker.c if it existed
             if marker_c_content is not None:
@@ -84,13 +190,16 @@ def _ensure_native_artifacts():
         print("Cleaning up build files...")
         shutil.rmtree(kson_copy_dir, ignore_errors=True)
 
+        # The build replaced src, so the earlier snapshot is stale
+        present = _present_files(src_kson_dir)
+
     # Post-condition: verify all required artifacts are present
-    missing = [f for f in required if not (src_kson_dir / f).exists()]
+    missing = [f for f in required if f not in present]
     if missing:
         raise RuntimeError(
             f"Required native artifacts missing for {sys.platform}: {', '.join(missing)}. "
-            f"Install from a pre-built wheel instead, or ensure a JDK is available "
-            f"so the Gradle build can produce them."
+            f"Install from a pre-built wheel instead, point {PREBUILT_BIN_DIR_ENV_VAR} at a directory "
+            f"containing them, or ensure a JDK is available so the Gradle build can produce them."
         )
 
 
@@ -0,0 +1,150 @@
+"""Bulk access to the tokens of an [Analysis]
+
+Unlike `__init__.py`, which krossover generates and rewrites on every build, this module is maintained by hand.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import List
+
+from . import (
+    JNI_OK,
+    Analysis,
+    AttachedJniThread,
+    TokenType,
+    _get_class,
+    _get_method,
+    _java_string_to_python_str,
+    _raise_exception_if_any,
+    _raise_if_null,
+    ffi,
+)
+
+# Members indexed by ordinal; their values are the Kotlin ordinals (see `TokenType._from_kotlin_enum`), so this skips
+# the `Enum(value)` lookup
+_TOKEN_TYPES = tuple(TokenType)
+_TOKEN_TYPE_NAMES = tuple(token_type.name for token_type in _TOKEN_TYPES)
+
+
+class TokenTable:
+    """The tokens of an [Analysis] as parallel columns, one entry per token
+
+    Obtained through [token_table]. Unlike [Token], reading from a table makes no JNI calls.
+
+    @param token_type_ids The ordinal of each token's [TokenType]
+    @param texts The text of each token
+    @param start_lines The (0-based) line where each token starts
+    @param start_columns The (0-based) column where each token starts
+    @param end_lines The (0-based) line where each token ends
+    @param end_columns The (0-based) column where each token ends
+    """
+
+    __slots__ = ("token_type_ids", "texts", "start_lines", "start_columns", "end_lines", "end_columns")
+
+    def __init__(self):
+        self.token_type_ids = array("i")
+        self.texts: List[str] = []
+        self.start_lines = array("i")
+        self.start_columns = array("i")
+        self.end_lines = array("i")
+        self.end_columns = array("i")
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def token_type(self, index: int) -> TokenType:
+        return _TOKEN_TYPES[self.token_type_ids[index]]
+
+    def token_type_name(self, index: int) -> str:
+        return _TOKEN_TYPE_NAMES[self.token_type_ids[index]]
+
+
+def _push_local_frame(env, capacity: int):
+    if env[0].PushLocalFrame(env, capacity) != JNI_OK:
+        _raise_exception_if_any(env)
+        raise RuntimeError("failed to push JNI local frame")
+
+
+def token_table(analysis: Analysis) -> TokenTable:
+    """The [Analysis.tokens] of `analysis`, fetched in bulk into a column-oriented [TokenTable]
+
+    Reading each field of each [Token] costs a JNI round-trip of its own, and each round-trip attaches the thread and
+    resolves its class and method anew. This reads every token within a single attachment, resolving each method once.
+    """
+    with AttachedJniThread() as env:
+        jni = env[0]
+        analysis_class = _get_class(env, b"org/kson/Analysis")
+        list_class = _get_class(env, b"java/util/List")
+        token_class = _get_class(env, b"org/kson/Token")
+        position_class = _get_class(env, b"org/kson/Position")
+        enum_class = _get_class(env, b"java/lang/Enum")
+        get_tokens = _get_method(env, analysis_class, b"getTokens", b"()Ljava/util/List;")
+        list_size = _get_method(env, list_class, b"size", b"()I")
+        list_get = _get_method(env, list_class, b"get", b"(I)Ljava/lang/Object;")
+        get_token_type = _get_method(env, token_class, b"getTokenType", b"()Lorg/kson/TokenType;")
+        get_text = _get_method(env, token_class, b"getText", b"()Ljava/lang/String;")
+        get_start = _get_method(env, token_class, b"getStart", b"()Lorg/kson/Position;")
+        get_end = _get_method(env, token_class, b"getEnd", b"()Lorg/kson/Position;")
+        get_line = _get_method(env, position_class, b"getLine", b"()I")
+        get_column = _get_method(env, position_class, b"getColumn", b"()I")
+        ordinal = _get_method(env, enum_class, b"ordinal", b"()I")
+
+        _push_local_frame(env, 1)
+        try:
+            tokens = jni.CallObjectMethod(env, analysis._jni_ref, get_tokens)
+            _raise_if_null(env, tokens)
+            count = jni.CallIntMethod(env, tokens, list_size)
+            _raise_exception_if_any(env)
+
+            # Hoisted out of the loop below, which runs once per token
+            call_object = jni.CallObjectMethod
+            call_int = jni.CallIntMethod
+            table = TokenTable()
+            append_token_type_id = table.token_type_ids.append
+            append_text = table.texts.append
+            append_start_line = table.start_lines.append
+            append_start_column = table.start_columns.append
+            append_end_line = table.end_lines.append
+            append_end_column = table.end_columns.append
+
+            for i in range(count):
+                # Each token creates five local refs, which a frame releases in one call instead of five
+                _push_local_frame(env, 5)
+                try:
+                    # No JNI method may be called while an exception is pending, so each call is checked before
+                    # the next one is made
+                    token = call_object(env, tokens, list_get, ffi.cast("jint", i))
+                    _raise_if_null(env, token)
+                    token_type = call_object(env, token, get_token_type)
+                    _raise_if_null(env, token_type)
+                    text = call_object(env, token, get_text)
+                    _raise_if_null(env, text)
+                    start = call_object(env, token, get_start)
+                    _raise_if_null(env, start)
+                    end = call_object(env, token, get_end)
+                    _raise_if_null(env, end)
+
+                    token_type_id = call_int(env, token_type, ordinal)
+                    _raise_exception_if_any(env)
+                    start_line = call_int(env, start, get_line)
+                    _raise_exception_if_any(env)
+                    start_column = call_int(env, start, get_column)
+                    _raise_exception_if_any(env)
+                    end_line = call_int(env, end, get_line)
+                    _raise_exception_if_any(env)
+                    end_column = call_int(env, end, get_column)
+                    _raise_exception_if_any(env)
+
+                    append_token_type_id(token_type_id)
+                    append_text(_java_string_to_python_str(text))
+                    append_start_line(start_line)
+                    append_start_column(start_column)
+                    append_end_line(end_line)
+                    append_end_column(end_column)
+                finally:
+                    jni.PopLocalFrame(env, ffi.NULL)
+
+            return table
+        finally:
+            jni.PopLocalFrame(env, ffi.NULL)
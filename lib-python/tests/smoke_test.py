@@ -1,22 +1,21 @@
 import pytest
 import typing
 from kson import *
+from kson.tokens import token_table
 
 
 NoneAny = typing.cast(Any, None)
 
 
 def messages_to_string(msgs):
-    output = ""
+    lines = []
     for msg in msgs:
         p1 = msg.start()
         p2 = msg.end()
-        line = (
-            f"{p1.line()},{p1.column()} to {p2.line()},{p2.column()} - {msg.message()}"
+        lines.append(
+            f"{p1.line()},{p1.column()} to {p2.line()},{p2.column()} - {msg.message()}\n"
         )
-        output += line.strip()
-        output += "\n"
-    return output
+    return "".join(lines)
 
 
 def test_none_argument():
@@ -211,13 +210,14 @@ def test_kson_analysis():
     assert analysis.errors() == []
 
     # Transform tokens to strings, so we can snapshot them
-    output = ""
+    lines = []
     for token in analysis.tokens():
         p1 = token.start()
         p2 = token.end()
         line = f"{p1.line()},{p1.column()} to {p2.line()},{p2.column()} - {token.token_type().name}: {token.text()}"
-        output += line.strip()
-        output += "\n"
+        # Tokens without text (like EOF) would leave a trailing space
+        lines.append(f"{line.rstrip()}\n")
+    output = "".join(lines)
 
     assert (
         output
@@ -237,6 +237,37 @@ def test_kson_analysis():
     )
 
 
+def test_token_table():
+    analysis = Kson.analyze("key: [1, 2]\nother: value", None)
+    table = token_table(analysis)
+    assert len(table) == len(analysis.tokens())
+    assert table.token_type(0) == TokenType.UNQUOTED_STRING
+
+    lines = []
+    for i in range(len(table)):
+        line = (
+            f"{table.start_lines[i]},{table.start_columns[i]} to {table.end_lines[i]},{table.end_columns[i]}"
+            f" - {table.token_type_name(i)}: {table.texts[i]}"
+        )
+        lines.append(line.rstrip())
+    output = "\n".join(lines)
+
+    assert (
+        output
+        == """0,0 to 0,3 - UNQUOTED_STRING: key
+0,3 to 0,4 - COLON: :
+0,5 to 0,6 - SQUARE_BRACKET_L: [
+0,6 to 0,7 - NUMBER: 1
+0,7 to 0,8 - COMMA: ,
+0,9 to 0,10 - NUMBER: 2
+0,10 to 0,11 - SQUARE_BRACKET_R: ]
+1,0 to 1,5 - UNQUOTED_STRING: other
+1,5 to 1,6 - COLON: :
+1,7 to 1,12 - UNQUOTED_STRING: value
+1,12 to 1,12 - EOF:"""
+    )
+
+
 def test_kson_value():
     input = """key: value
 list:
@@ -695,3 +726,13 @@ def test_embed_rule_result_success_direct_construction():
 def test_embed_rule_result_failure_direct_construction():
     failure = EmbedRuleResult.Failure("something went wrong")
     assert failure.message() == "something went wrong"
+
+
+def test_kotlin_object_equality():
+    tokens = Kson.analyze("key: value", None).tokens()
+    start = tokens[0].start()
+    same_start = tokens[0].start()
+    other_start = tokens[1].start()
+    assert start == same_start
+    assert hash(start) == hash(same_start)
+    assert start != other_start
@@ -1,6 +1,7 @@
 """Tests for the custom build backend's platform-aware native artifact detection."""
 
-import subprocess
+import errno
+import io
 import sys
 from unittest.mock import patch
 
@@ -31,6 +32,12 @@ class TestPlatformNativeLibrary:
 class TestEnsureNativeArtifacts:
     """Verify that _ensure_native_artifacts only considers the current platform's library."""
 
+    def _fake_gradle(self, mock_popen, returncode, output=""):
+        """Make the mocked Popen behave like a Gradle run with the given exit code and output."""
+        process = mock_popen.return_value.__enter__.return_value
+        process.stdout = io.StringIO(output)
+        process.returncode = returncode
+
     def _place_all_required_artifacts(self, directory):
         """Place all required artifacts for the current platform."""
         for f in build_backend._required_artifacts():
@@ -46,9 +53,9 @@ class TestEnsureNativeArtifacts:
         self._place_all_required_artifacts(src_kson)
 
         with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
-            with patch.object(build_backend.subprocess, "run") as mock_run:
+            with patch.object(build_backend.subprocess, "Popen") as mock_popen:
                 build_backend._ensure_native_artifacts()
-                mock_run.assert_not_called()
+                mock_popen.assert_not_called()
 
     def test_triggers_build_when_only_foreign_artifact_exists(self, tmp_path):
         """Build is triggered when only a *different* platform's library is present."""
@@ -65,13 +72,11 @@ class TestEnsureNativeArtifacts:
         (src_kson / "jni_simplified.h").touch()
 
         with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
-            with patch.object(build_backend.subprocess, "run") as mock_run:
-                mock_run.return_value = subprocess.CompletedProcess(
-                    args=[], returncode=1, stdout="", stderr="fail",
-                )
+            with patch.object(build_backend.subprocess, "Popen") as mock_popen:
+                self._fake_gradle(mock_popen, returncode=1, output="fail\n")
                 with pytest.raises(RuntimeError, match="Failed to build native artifacts"):
                     build_backend._ensure_native_artifacts()
-                mock_run.assert_called_once()
+                mock_popen.assert_called_once()
 
     def test_triggers_build_when_header_missing(self, tmp_path):
         """Build is triggered when the native lib exists but jni_simplified.h is missing."""
@@ -84,13 +89,31 @@ class TestEnsureNativeArtifacts:
         (src_kson / current_lib).touch()
 
         with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
-            with patch.object(build_backend.subprocess, "run") as mock_run:
-                mock_run.return_value = subprocess.CompletedProcess(
-                    args=[], returncode=1, stdout="", stderr="fail",
-                )
+            with patch.object(build_backend.subprocess, "Popen") as mock_popen:
+                self._fake_gradle(mock_popen, returncode=1, output="fail\n")
                 with pytest.raises(RuntimeError, match="Failed to build native artifacts"):
                     build_backend._ensure_native_artifacts()
-                mock_run.assert_called_once()
+                mock_popen.assert_called_once()
+
+    def test_build_failure_reports_tail_of_gradle_output(self, tmp_path):
+        """A failed build streams Gradle's output and includes only its last lines in the error."""
+        src_kson = tmp_path / "src" / "kson"
+        src_kson.mkdir(parents=True)
+        kson_sdist = tmp_path / "kson-sdist"
+        kson_sdist.mkdir()
+
+        output = "".join(f"line {i}\n" for i in range(build_backend.GRADLE_LOG_TAIL_LINES + 50))
+
+        with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
+            with patch.object(build_backend.subprocess, "Popen") as mock_popen:
+                self._fake_gradle(mock_popen, returncode=1, output=output)
+                with pytest.raises(RuntimeError) as excinfo:
+                    build_backend._ensure_native_artifacts()
+
+        message = str(excinfo.value)
+        assert f"line {build_backend.GRADLE_LOG_TAIL_LINES + 49}\n" in message
+        assert "line 49\n" not in message
+        assert "line 50\n" in message
 
     def test_errors_when_artifacts_missing_and_no_kson_sdist(self, tmp_path):
         """Raises when artifacts are missing and there's no kson-sdist to build from."""
@@ -101,6 +124,67 @@ class TestEnsureNativeArtifacts:
             with pytest.raises(RuntimeError, match="Required native artifacts missing"):
                 build_backend._ensure_native_artifacts()
 
+    def test_copies_prebuilt_artifacts_instead_of_building(self, tmp_path, monkeypatch):
+        """Artifacts are copied from KSON_PREBUILT_BIN_DIR without running Gradle, even if kson-sdist exists."""
+        src_kson = tmp_path / "src" / "kson"
+        src_kson.mkdir(parents=True)
+        (tmp_path / "kson-sdist").mkdir()
+        prebuilt = tmp_path / "prebuilt"
+        prebuilt.mkdir()
+
+        native_lib = build_backend._platform_native_library()
+        (prebuilt / native_lib).write_bytes(b"prebuilt-lib")
+        (prebuilt / "jni_simplified.h").write_text("/* header */")
+        monkeypatch.setenv(build_backend.PREBUILT_BIN_DIR_ENV_VAR, str(prebuilt))
+
+        with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
+            with patch.object(build_backend.subprocess, "Popen") as mock_popen:
+                build_backend._ensure_native_artifacts()
+                mock_popen.assert_not_called()
+
+        assert (src_kson / native_lib).read_bytes() == b"prebuilt-lib"
+        assert (src_kson / "jni_simplified.h").read_text() == "/* header */\n"
+
+    def test_preprocesses_raw_prebuilt_header(self, tmp_path, monkeypatch):
+        """A raw header from the native image build is preprocessed the same way CopyNativeArtifactsTask does."""
+        src_kson = tmp_path / "src" / "kson"
+        src_kson.mkdir(parents=True)
+        prebuilt = tmp_path / "prebuilt"
+        prebuilt.mkdir()
+
+        (prebuilt / build_backend._platform_native_library()).write_bytes(b"prebuilt-lib")
+        (prebuilt / "jni_simplified.h").write_text(
+            "#ifndef JNI_H\n"
+            "#define JNI_H\n"
+            "typedef int jint;\n"
+            "#ifdef __cplusplus\n"
+            "extern \"C\" {\n"
+            "#else\n"
+            "typedef unsigned char jboolean;\n"
+            "#endif\n"
+            "typedef float __attribute__((vector_size(16))) float4;\n"
+            "#endif\n"
+        )
+        monkeypatch.setenv(build_backend.PREBUILT_BIN_DIR_ENV_VAR, str(prebuilt))
+
+        with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
+            build_backend._ensure_native_artifacts()
+
+        assert (src_kson / "jni_simplified.h").read_text() == "typedef int jint;\ntypedef unsigned char jboolean;\n"
+
+    def test_errors_when_prebuilt_dir_lacks_artifacts(self, tmp_path, monkeypatch):
+        """Raises when KSON_PREBUILT_BIN_DIR does not contain everything this platform needs."""
+        src_kson = tmp_path / "src" / "kson"
+        src_kson.mkdir(parents=True)
+        prebuilt = tmp_path / "prebuilt"
+        prebuilt.mkdir()
+        (prebuilt / "jni_simplified.h").write_text("/* header */")
+        monkeypatch.setenv(build_backend.PREBUILT_BIN_DIR_ENV_VAR, str(prebuilt))
+
+        with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
+            with pytest.raises(RuntimeError, match="Required native artifacts missing"):
+                build_backend._ensure_native_artifacts()
+
     def test_successful_build_replaces_src_and_preserves_marker(self, tmp_path):
         """On successful build, src is replaced with kson-sdist output and _marker.c is preserved."""
         src_kson = tmp_path / "src" / "kson"
@@ -120,10 +204,8 @@ class TestEnsureNativeArtifacts:
         (src_kson / "_marker.c").write_bytes(marker_content)
 
         with patch.object(build_backend, "__file__", str(tmp_path / "build_backend.py")):
-            with patch.object(build_backend.subprocess, "run") as mock_run:
-                mock_run.return_value = subprocess.CompletedProcess(
-                    args=[], returncode=0, stdout="", stderr="",
-                )
+            with patch.object(build_backend.subprocess, "Popen") as mock_popen:
+                self._fake_gradle(mock_popen, returncode=0)
                 build_backend._ensure_native_artifacts()
 
         # src was replaced with kson-sdist output
@@ -135,3 +217,44 @@ class TestEnsureNativeArtifacts:
 
         # kson-sdist was cleaned up
         assert not kson_sdist.exists()
+
+
+class TestMoveTree:
+    def _make_tree(self, tmp_path):
+        src = tmp_path / "src"
+        (src / "kson").mkdir(parents=True)
+        (src / "kson" / "file.txt").write_text("content")
+        return src
+
+    def test_renames_directory(self, tmp_path):
+        src = self._make_tree(tmp_path)
+
+        dst = tmp_path / "dst"
+        build_backend._move_tree(src, dst)
+
+        assert not src.exists()
+        assert (dst / "kson" / "file.txt").read_text() == "content"
+
+    def test_copies_across_filesystems(self, tmp_path):
+        src = self._make_tree(tmp_path)
+
+        dst = tmp_path / "dst"
+        cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+        with patch.object(build_backend.os, "replace", side_effect=cross_device):
+            build_backend._move_tree(src, dst)
+
+        assert not src.exists()
+        assert (dst / "kson" / "file.txt").read_text() == "content"
+
+    def test_fails_on_non_empty_target(self, tmp_path):
+        """A leftover dst is an error, instead of src being moved into it."""
+        src = self._make_tree(tmp_path)
+        dst = tmp_path / "dst"
+        dst.mkdir()
+        (dst / "stale.txt").write_text("stale")
+
+        with pytest.raises(OSError):
+            build_backend._move_tree(src, dst)
+
+        assert not (dst / "src").exists()
+        assert (src / "kson" / "file.txt").read_text() == "content"